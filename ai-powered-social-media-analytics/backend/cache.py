@@ -0,0 +1,208 @@
+"""
+Caching helpers for read-heavy endpoints
+Two-tier cache-aside (in-process L1, Redis L2) per user and query string,
+plus HTTP Cache-Control/ETag headers
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from functools import wraps
+from cachetools import TTLCache
+from flask import request, g, Response, make_response
+import redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+# Key schema: v1:sma:<prefix>:<user_id>:<query_hash>
+CACHE_VERSION = 'v1'
+CACHE_NAMESPACE = 'sma'
+
+LOCK_TTL = 5            # seconds a recompute lock is held at most
+LOCK_WAIT = 2.0         # seconds to wait for another worker's recompute
+LOCK_POLL = 0.05
+RETRY_AFTER = 30        # seconds to bypass Redis after a connection failure
+
+redis_pool = redis.ConnectionPool.from_url(
+    REDIS_URL,
+    socket_timeout=0.5,
+    socket_connect_timeout=0.5
+)
+redis_client = redis.Redis(connection_pool=redis_pool)
+
+_redis_down_until = 0
+
+# In-process L1 caches, one per decorated endpoint. Other workers' copies
+# aren't invalidated on writes, so keep their TTL short.
+LOCAL_CACHE_SIZE = 2048
+_local_caches = []
+_local_lock = threading.Lock()
+
+
+def _redis_available():
+    return time.time() >= _redis_down_until
+
+
+def _mark_redis_down(error):
+    """Skip Redis for a while so an outage doesn't add latency to every request"""
+    global _redis_down_until
+    _redis_down_until = time.time() + RETRY_AFTER
+    logger.warning(f"Redis unavailable, bypassing cache for {RETRY_AFTER}s: {str(error)}")
+
+
+def cache_key(prefix, user_id):
+    """Build the cache key for the current request"""
+    query = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+    query_hash = hashlib.md5(query.encode('utf-8')).hexdigest()[:16]
+    return f'{CACHE_VERSION}:{CACHE_NAMESPACE}:{prefix}:{user_id}:{query_hash}'
+
+
+def _get(key):
+    if not _redis_available():
+        return None
+    try:
+        return redis_client.get(key)
+    except redis.RedisError as e:
+        _mark_redis_down(e)
+        return None
+
+
+def _set(key, ttl, body):
+    if not _redis_available():
+        return
+    try:
+        redis_client.setex(key, ttl, body)
+    except redis.RedisError as e:
+        _mark_redis_down(e)
+
+
+def _acquire_lock(key):
+    """Returns True if this request should recompute the value"""
+    if not _redis_available():
+        return True
+    try:
+        return bool(redis_client.set(f'{key}:lock', 1, nx=True, ex=LOCK_TTL))
+    except redis.RedisError as e:
+        _mark_redis_down(e)
+        return True
+
+
+def _release_lock(key):
+    if not _redis_available():
+        return
+    try:
+        redis_client.delete(f'{key}:lock')
+    except redis.RedisError as e:
+        _mark_redis_down(e)
+
+
+def _wait_for(key):
+    """Poll for a value another request is currently computing"""
+    deadline = time.time() + LOCK_WAIT
+    while time.time() < deadline:
+        time.sleep(LOCK_POLL)
+        body = _get(key)
+        if body is not None:
+            return body
+    return None
+
+
+def _cached_response(body):
+    return Response(body, status=200, mimetype='application/json')
+
+
+def cached(prefix, ttl, local_ttl=None):
+    """Decorator caching a view's JSON response in Redis (apply after token_required)
+
+    With local_ttl, responses are also kept in this process for that many
+    seconds and served without a Redis round trip.
+    """
+    local = None
+    if local_ttl:
+        local = TTLCache(maxsize=LOCAL_CACHE_SIZE, ttl=local_ttl)
+        _local_caches.append(local)
+
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            key = cache_key(prefix, g.user_id)
+
+            if local is not None:
+                with _local_lock:
+                    body = local.get(key)
+                if body is not None:
+                    return _cached_response(body)
+
+            body = _get(key)
+            if body is not None:
+                if local is not None:
+                    with _local_lock:
+                        local[key] = body
+                return _cached_response(body)
+
+            # Only one request recomputes; the others wait for its result
+            has_lock = _acquire_lock(key)
+            if not has_lock:
+                body = _wait_for(key)
+                if body is not None:
+                    return _cached_response(body)
+
+            try:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code == 200 and response.mimetype == 'application/json':
+                    body = response.get_data()
+                    _set(key, ttl, body)
+                    if local is not None:
+                        with _local_lock:
+                            local[key] = body
+                return response
+            finally:
+                if has_lock:
+                    _release_lock(key)
+
+        return decorated
+    return decorator
+
+
+def invalidate_user_cache(user_id):
+    """Delete all cached responses for a user"""
+    marker = f':{user_id}:'
+    with _local_lock:
+        for local in _local_caches:
+            for key in [k for k in local if marker in k]:
+                del local[key]
+
+    if not _redis_available():
+        return
+    try:
+        pattern = f'{CACHE_VERSION}:{CACHE_NAMESPACE}:*:{user_id}:*'
+        keys = list(redis_client.scan_iter(match=pattern, count=500))
+        if keys:
+            redis_client.delete(*keys)
+    except redis.RedisError as e:
+        _mark_redis_down(e)
+
+
+def http_cache(max_age, private=False):
+    """Decorator adding Cache-Control and a weak ETag; answers 304 when If-None-Match matches"""
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+            if private:
+                response.cache_control.private = True
+            else:
+                response.cache_control.public = True
+            response.cache_control.max_age = max_age
+            response.set_etag(hashlib.md5(response.get_data()).hexdigest(), weak=True)
+            return response.make_conditional(request)
+
+        return decorated
+    return decorator
@@ -0,0 +1,29 @@
+"""
+Gunicorn production config
+Run with: gunicorn -c gunicorn.conf.py app:app
+Set PROMETHEUS_MULTIPROC_DIR to an empty, writable directory to aggregate
+/metrics across workers
+
+Workers are gevent greenlets (USE_GEVENT=1). With the MySQL backend
+(utils.py) the connector then runs with use_pure=True: its default C
+extension does socket I/O that monkey patching can't reach, so each query
+would block the whole worker.
+"""
+
+import os
+import multiprocessing
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gevent'
+worker_connections = int(os.getenv('WORKER_CONNECTIONS', 1000))
+
+# Patch the app's own imports too (see top of app.py)
+raw_env = ['USE_GEVENT=1']
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live metrics from the multiprocess directory"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_flask_exporter.multiprocess import GunicornInternalPrometheusMetrics
+        GunicornInternalPrometheusMetrics.mark_process_dead_on_child_exit(worker.pid)
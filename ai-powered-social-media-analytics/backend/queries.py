@@ -0,0 +1,46 @@
+"""
+Typed query-string models for GET endpoints
+Parsed once with pydantic so bad input returns 400 instead of a 500
+"""
+
+from typing import Literal, Optional
+from pydantic import BaseModel, Field, ValidationError
+
+
+class PostsQuery(BaseModel):
+    account_id: Optional[int] = None
+    limit: int = Field(50, ge=0, le=1000)
+    offset: int = Field(0, ge=0)
+
+
+class SummaryQuery(BaseModel):
+    period: str = '7'
+
+
+class TrendingQuery(BaseModel):
+    limit: int = Field(10, ge=0, le=1000)
+
+
+class ExportQuery(BaseModel):
+    format: Literal['json', 'csv', 'ndjson'] = 'json'
+
+
+class CompetitorQuery(BaseModel):
+    industry: str = 'technology'
+
+
+class ForecastQuery(BaseModel):
+    months: int = Field(3, ge=0, le=60)
+    layout: Literal['rows', 'columns'] = 'rows'
+
+
+def parse_query(model, args):
+    """Parse request args into a query model and return (query, error)"""
+    # Treat empty values (?account_id=) as missing, like the old falsy checks
+    values = {k: v for k, v in args.items() if v != ''}
+    try:
+        return model.model_validate(values), None
+    except ValidationError as e:
+        error = e.errors()[0]
+        field = '.'.join(str(part) for part in error['loc'])
+        return None, f"Invalid query parameter '{field}': {error['msg']}"
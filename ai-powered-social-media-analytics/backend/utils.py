@@ -5,22 +5,39 @@ Production-ready with error handling, caching, and advanced features
 
 import os
 import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
 import jwt
+import re
 import mysql.connector
+from mysql.connector import pooling
+from mysql.connector.constants import ClientFlag
 from datetime import datetime, timedelta
-from flask import jsonify
+from flask import jsonify, Response, stream_with_context
 from dotenv import load_dotenv
-import random
-import json
+import orjson
 import csv
 import io
+import itertools
+import threading
+import hmac
+import base64
+import hashlib
+import time
+from functools import lru_cache
+import numpy as np
+from numba import njit
+from contextlib import contextmanager
+from theine import Cache
 from cachetools import TTLCache
 from email_validator import validate_email, EmailNotValidError
 
 load_dotenv()
 
-# Simple in-memory cache (30 minutes TTL)
-analytics_cache = TTLCache(maxsize=1000, ttl=1800)
+# In-memory cache (30 minutes TTL); W-TinyLFU keeps frequently requested users
+# resident instead of evicting whatever is least recent
+ANALYTICS_CACHE_TTL = timedelta(minutes=30)
+analytics_cache = Cache('tlfu', 1000)
 
 # ==================== Database Configuration ====================
 
@@ -30,51 +47,145 @@ DB_CONFIG = {
     'password': os.getenv('MYSQL_PASSWORD', ''),
     'database': os.getenv('MYSQL_DB', 'ai_social_analytics'),
     'port': int(os.getenv('MYSQL_PORT', 3306)),
+    # rowcount reports matched rather than changed rows, so an UPDATE that
+    # rewrites the same values still counts as a hit
+    'client_flags': [ClientFlag.FOUND_ROWS],
+    # The C extension does its own socket I/O, which gevent's monkey patching
+    # can't make cooperative; under gevent workers use the pure-Python protocol
+    'use_pure': bool(os.getenv('USE_GEVENT')),
 }
 
+DB_POOL_SIZE = int(os.getenv('MYSQL_POOL_SIZE', 25))
+DB_POOL_TIMEOUT = float(os.getenv('MYSQL_POOL_TIMEOUT', 5))  # seconds to wait for a free connection
+_db_pool = None
+_db_pool_lock = threading.Lock()
+# The pool raises PoolError as soon as it is empty, so callers queue here
+# for a connection slot instead (cooperatively under gevent)
+_db_slots = threading.BoundedSemaphore(DB_POOL_SIZE)
+
 JWT_SECRET = os.getenv('JWT_SECRET', 'dev_jwt_secret_change_in_production')
+TOKEN_TTL_SECONDS = 30 * 24 * 3600  # 30 days
+
+# bcrypt cost factor (OWASP minimum is 10); existing hashes keep their own cost
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 10))
+
+# Scheme for new password hashes ('bcrypt' or 'argon2'); logins verify either,
+# so switching schemes doesn't lock out existing users
+PASSWORD_SCHEME = os.getenv('PASSWORD_SCHEME', 'bcrypt')
+_argon2 = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
+# Columns returned to clients for a post (see db/schema.sql)
+POST_COLUMNS = (
+    'id, user_id, account_id, content, post_date, likes, comments, shares, impressions, '
+    'followers_gained, followers_lost, sentiment, ai_score, keywords, created_at'
+)
+
+# Hot post queries, built once instead of formatting POST_COLUMNS on every call
+POSTS_BY_ACCOUNT_SQL = (
+    f"SELECT {POST_COLUMNS} FROM posts WHERE user_id=%s AND account_id=%s "
+    "ORDER BY post_date DESC LIMIT %s OFFSET %s"
+)
+POSTS_BY_USER_SQL = f"SELECT {POST_COLUMNS} FROM posts WHERE user_id=%s ORDER BY post_date DESC LIMIT %s OFFSET %s"
+TRENDING_POSTS_SQL = (
+    f"SELECT {POST_COLUMNS} FROM posts WHERE user_id=%s "
+    "ORDER BY (likes + comments + shares) DESC LIMIT %s"
+)
+EXPORT_POSTS_SQL = f"SELECT {POST_COLUMNS} FROM posts WHERE user_id=%s ORDER BY post_date DESC"
 
 # ==================== Validation Functions ====================
 
+# Deliverability checks query DNS for the domain; only done with STRICT_EMAIL=1
+STRICT_EMAIL = os.getenv('STRICT_EMAIL') == '1'
+
+@lru_cache(maxsize=4096)
 def validate_email_format(email):
-    """Validate email format"""
+    """Validate email format; returns the normalized address or None"""
     try:
-        valid = validate_email(email)
+        valid = validate_email(email, check_deliverability=STRICT_EMAIL)
         return valid.email
     except EmailNotValidError:
         return None
 
+# 3-50 letters, digits, underscores or dashes, at least one of them alphanumeric
+_USERNAME_RE = re.compile(r'(?=.*[^\W_])[\w-]{3,50}')
+# At least 8 characters with an upper case letter, a lower case letter and a digit
+_PASSWORD_RE = re.compile(r'(?=.*[A-Z])(?=.*[a-z])(?=.*\d).{8,}', re.DOTALL)
+
 def validate_username(username):
     """Validate username format"""
-    if not username or len(username) < 3:
-        return False
-    if len(username) > 50:
-        return False
-    if not username.replace('_', '').replace('-', '').isalnum():
-        return False
-    return True
+    return bool(username) and _USERNAME_RE.fullmatch(username) is not None
 
 def validate_password(password):
     """Validate password strength"""
-    if not password or len(password) < 8:
-        return False
-    has_upper = any(c.isupper() for c in password)
-    has_lower = any(c.islower() for c in password)
-    has_digit = any(c.isdigit() for c in password)
-    return has_upper and has_lower and has_digit
+    return bool(password) and _PASSWORD_RE.fullmatch(password) is not None
 
 def get_db():
-    """Create and return database connection"""
+    """Get a pooled database connection (db.close() returns it to the pool)"""
+    global _db_pool
     try:
-        return mysql.connector.connect(**DB_CONFIG)
+        # Created lazily so importing this module doesn't require a live database
+        if _db_pool is None:
+            with _db_pool_lock:
+                if _db_pool is None:
+                    _db_pool = pooling.MySQLConnectionPool(
+                        pool_name='app',
+                        pool_size=DB_POOL_SIZE,
+                        **DB_CONFIG
+                    )
+        return _db_pool.get_connection()
     except mysql.connector.Error as e:
         raise Exception(f"Database connection failed: {str(e)}")
 
 
+def _release(db, cursor):
+    """Close the cursor and return db to the pool with no result left unread
+
+    An unbuffered read abandoned mid-way (a client leaving a streamed export)
+    leaves rows on the wire, which would make the pool's reset_session() fail.
+    If they can't be drained the session is dropped instead, so the pool
+    reconnects it on the next checkout rather than handing it out dirty.
+    """
+    try:
+        if db.unread_result:
+            db.consume_results()
+        cursor.close()
+    except mysql.connector.Error:
+        db.disconnect()
+        try:
+            db.close()
+        except mysql.connector.Error:
+            pass  # reset_session() on the dropped session; it is back in the pool regardless
+        return
+    db.close()
+
+
+@contextmanager
+def db_cursor(**cursor_args):
+    """Yield (connection, cursor); both are released even if the block raises
+
+    Waits up to DB_POOL_TIMEOUT for a free pool connection.
+    """
+    if not _db_slots.acquire(timeout=DB_POOL_TIMEOUT):
+        raise Exception("Database connection failed: pool exhausted")
+    try:
+        db = get_db()
+        try:
+            cursor = db.cursor(**cursor_args)
+        except BaseException:
+            db.close()
+            raise
+        try:
+            yield db, cursor
+        finally:
+            _release(db, cursor)
+    finally:
+        _db_slots.release()
+
+
 # ==================== Authentication Functions ====================
 
 def register_user(data):
-    """Register a new user with validation and bcrypt hashing"""
+    """Register a new user with validation and password hashing"""
     username = data.get('username', '').strip()
     email = data.get('email', '').strip()
     password = data.get('password', '')
@@ -93,20 +204,16 @@ def register_user(data):
     if len(password) < 8:
         return jsonify({'error': 'Password must be at least 8 characters'}), 400
 
-    # Hash password with bcrypt
     try:
-        hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=12))
+        hashed = hash_password(password)
         
-        db = get_db()
-        cursor = db.cursor()
-        cursor.execute(
-            "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)",
-            (username, valid_email, hashed.decode('utf-8'))
-        )
-        db.commit()
-        user_id = cursor.lastrowid
-        cursor.close()
-        db.close()
+        with db_cursor() as (db, cursor):
+            cursor.execute(
+                "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)",
+                (username, valid_email, hashed)
+            )
+            db.commit()
+            user_id = cursor.lastrowid
         
         return jsonify({
             'message': 'User registered successfully',
@@ -124,6 +231,63 @@ def register_user(data):
         return jsonify({'error': f'Unexpected error: {str(e)}'}), 500
 
 
+def hash_password(password):
+    """Hash a new password with PASSWORD_SCHEME"""
+    if PASSWORD_SCHEME == 'argon2':
+        return _argon2.hash(password)
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
+
+
+def _verify_hash(password, password_hash):
+    if password_hash.startswith('$argon2'):
+        try:
+            return _argon2.verify(password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+# Recently verified (password, hash) pairs, so quick login retries skip hashing.
+# Keys are HMACs, never the password itself; failures are not cached.
+_verified_passwords = TTLCache(maxsize=10000, ttl=60)
+_verified_passwords_lock = threading.Lock()
+
+
+def check_password(password, password_hash):
+    """Verify a bcrypt or argon2 hash, with a short-lived cache of successful checks"""
+    key = hmac.new(
+        JWT_SECRET.encode('utf-8'),
+        password_hash.encode('utf-8') + b'\0' + password.encode('utf-8'),
+        hashlib.sha256
+    ).digest()
+    with _verified_passwords_lock:
+        if key in _verified_passwords:
+            return True
+
+    if not _verify_hash(password, password_hash):
+        return False
+    with _verified_passwords_lock:
+        _verified_passwords[key] = True
+    return True
+
+
+# HS256 tokens are assembled directly: the header never changes, so each login
+# only serializes and signs the claims. jwt.decode still verifies them.
+_JWT_HEADER_B64 = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b'=')
+_JWT_KEY = JWT_SECRET.encode('utf-8')
+
+
+def _b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+
+def encode_token(claims):
+    """Sign claims as a compact HS256 JWT (same format as jwt.encode)"""
+    signing_input = _JWT_HEADER_B64 + b'.' + _b64url(orjson.dumps(claims))
+    signature = hmac.new(_JWT_KEY, signing_input, hashlib.sha256).digest()
+    return (signing_input + b'.' + _b64url(signature)).decode('ascii')
+
+
 def login_user(data):
     """Authenticate user and return JWT token"""
     email = data.get('email', '').strip()
@@ -133,21 +297,18 @@ def login_user(data):
         return jsonify({'error': 'Email and password required'}), 400
 
     try:
-        db = get_db()
-        cursor = db.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM users WHERE email=%s", (email,))
-        user = cursor.fetchone()
-        cursor.close()
-        db.close()
+        with db_cursor(dictionary=True) as (db, cursor):
+            cursor.execute("SELECT * FROM users WHERE email=%s", (email,))
+            user = cursor.fetchone()
 
-        if user and bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')):
+        if user and check_password(password, user['password_hash']):
             # Create JWT token with extended expiration
-            token = jwt.encode({
+            token = encode_token({
                 'user_id': user['id'],
                 'email': user['email'],
                 'username': user['username'],
-                'exp': datetime.utcnow() + timedelta(days=30)
-            }, JWT_SECRET, algorithm='HS256')
+                'exp': int(time.time()) + TOKEN_TTL_SECONDS
+            })
 
             return jsonify({
                 'token': token,
@@ -166,24 +327,36 @@ def login_user(data):
         return jsonify({'error': f'Unexpected error: {str(e)}'}), 500
 
 
-def verify_token(token):
-    """Verify JWT token and return (user_id, error)"""
+def verify_token_claims(token):
+    """Verify JWT token and return (user_id, exp, error)"""
     try:
+        # token_required caches the result; it re-checks exp itself on hits
         payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
         user_id = payload.get('user_id')
         if not user_id:
-            return None, 'Invalid token: no user_id'
-        return user_id, None
+            return None, None, 'Invalid token: no user_id'
+        return user_id, payload.get('exp'), None
     except jwt.ExpiredSignatureError:
-        return None, 'Token has expired'
+        return None, None, 'Token has expired'
     except jwt.InvalidTokenError:
-        return None, 'Invalid token'
+        return None, None, 'Invalid token'
     except Exception as e:
-        return None, f'Token verification failed: {str(e)}'
+        return None, None, f'Token verification failed: {str(e)}'
+
+
+def verify_token(token):
+    """Verify JWT token and return (user_id, error)"""
+    user_id, _, error = verify_token_claims(token)
+    return user_id, error
 
 
 # ==================== Social Account Functions ====================
 
+PLATFORMS = ['instagram', 'twitter', 'youtube', 'tiktok', 'linkedin']
+VALID_PLATFORMS = frozenset(PLATFORMS)
+INVALID_PLATFORM_ERROR = f'Platform must be one of {PLATFORMS}'
+
+
 def connect_account(data):
     """Connect a social media account (mock OAuth)"""
     user_id = data.get('user_id')
@@ -193,35 +366,28 @@ def connect_account(data):
     if not (user_id and platform and account_name):
         return jsonify({'error': 'Missing required fields'}), 400
 
-    valid_platforms = ['instagram', 'twitter', 'youtube', 'tiktok', 'linkedin']
-    if platform not in valid_platforms:
-        return jsonify({'error': f'Platform must be one of {valid_platforms}'}), 400
+    if platform not in VALID_PLATFORMS:
+        return jsonify({'error': INVALID_PLATFORM_ERROR}), 400
 
     if len(account_name) < 2 or len(account_name) > 100:
         return jsonify({'error': 'Invalid account name length'}), 400
 
     try:
-        db = get_db()
-        cursor = db.cursor()
-        
-        # Check if user exists
-        cursor.execute("SELECT id FROM users WHERE id=%s", (user_id,))
-        if not cursor.fetchone():
-            return jsonify({'error': 'User not found'}), 404
+        with db_cursor() as (db, cursor):
+            # Check if user exists
+            cursor.execute("SELECT id FROM users WHERE id=%s", (user_id,))
+            if not cursor.fetchone():
+                return jsonify({'error': 'User not found'}), 404
         
-        cursor.execute(
-            "INSERT INTO social_accounts (user_id, platform, account_name) VALUES (%s, %s, %s)",
-            (user_id, platform, account_name)
-        )
-        db.commit()
-        account_id = cursor.lastrowid
-        cursor.close()
-        db.close()
+            cursor.execute(
+                "INSERT INTO social_accounts (user_id, platform, account_name) VALUES (%s, %s, %s)",
+                (user_id, platform, account_name)
+            )
+            db.commit()
+            account_id = cursor.lastrowid
 
         # Clear cache
-        cache_key = f"accounts_{user_id}"
-        if cache_key in analytics_cache:
-            del analytics_cache[cache_key]
+        analytics_cache.delete(f"accounts_{user_id}")
 
         return jsonify({
             'message': f'{platform.capitalize()} account connected successfully',
@@ -238,26 +404,24 @@ def connect_account(data):
 def get_connected_accounts(user_id):
     """Get all connected social accounts for a user"""
     cache_key = f"accounts_{user_id}"
-    
-    if cache_key in analytics_cache:
-        return jsonify(analytics_cache[cache_key]), 200
+
+    cached = analytics_cache.get(cache_key)
+    if cached is not None:
+        return jsonify(cached), 200
 
     try:
-        db = get_db()
-        cursor = db.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM social_accounts WHERE user_id=%s ORDER BY connected_at DESC", (user_id,))
-        accounts = cursor.fetchall()
-        cursor.close()
-        db.close()
+        with db_cursor(dictionary=True) as (db, cursor):
+            cursor.execute("SELECT * FROM social_accounts WHERE user_id=%s ORDER BY connected_at DESC", (user_id,))
+            accounts = cursor.fetchall()
 
         result = {
             'accounts': accounts,
             'total': len(accounts),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': _now_iso()
         }
 
         # Cache the result
-        analytics_cache[cache_key] = result
+        analytics_cache.set(cache_key, result, ANALYTICS_CACHE_TTL)
 
         return jsonify(result), 200
     except mysql.connector.Error as e:
@@ -271,38 +435,34 @@ def get_connected_accounts(user_id):
 def get_posts(user_id, account_id=None, limit=50, offset=0):
     """Get posts for a user, optionally filtered by account"""
     try:
-        db = get_db()
-        cursor = db.cursor(dictionary=True)
-
-        if account_id:
-            cursor.execute(
-                "SELECT * FROM posts WHERE user_id=%s AND account_id=%s ORDER BY post_date DESC LIMIT %s OFFSET %s",
-                (user_id, account_id, limit, offset)
-            )
-        else:
-            cursor.execute(
-                "SELECT * FROM posts WHERE user_id=%s ORDER BY post_date DESC LIMIT %s OFFSET %s",
-                (user_id, limit, offset)
-            )
+        with db_cursor(dictionary=True) as (db, cursor):
+            if account_id:
+                cursor.execute(
+                    POSTS_BY_ACCOUNT_SQL,
+                    (user_id, account_id, limit, offset)
+                )
+            else:
+                cursor.execute(
+                    POSTS_BY_USER_SQL,
+                    (user_id, limit, offset)
+                )
 
-        posts = cursor.fetchall()
+            posts = cursor.fetchall()
         
-        # Get total count
-        if account_id:
-            cursor.execute("SELECT COUNT(*) as count FROM posts WHERE user_id=%s AND account_id=%s", (user_id, account_id))
-        else:
-            cursor.execute("SELECT COUNT(*) as count FROM posts WHERE user_id=%s", (user_id,))
+            # Get total count
+            if account_id:
+                cursor.execute("SELECT COUNT(*) as count FROM posts WHERE user_id=%s AND account_id=%s", (user_id, account_id))
+            else:
+                cursor.execute("SELECT COUNT(*) as count FROM posts WHERE user_id=%s", (user_id,))
         
-        total = cursor.fetchone()['count']
-        cursor.close()
-        db.close()
+            total = cursor.fetchone()['count']
 
         return jsonify({
             'posts': posts,
             'total': total,
             'limit': limit,
             'offset': offset,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': _now_iso()
         }), 200
     except mysql.connector.Error as e:
         return jsonify({'error': 'Database error'}), 500
@@ -324,18 +484,15 @@ def add_post(data):
         return jsonify({'error': 'Missing required fields'}), 400
 
     try:
-        db = get_db()
-        cursor = db.cursor()
-        cursor.execute(
-            """INSERT INTO posts 
-               (user_id, account_id, content, post_date, likes, comments, shares, impressions)
-               VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
-            (user_id, account_id, content, datetime.now(), likes, comments, shares, impressions)
-        )
-        db.commit()
-        post_id = cursor.lastrowid
-        cursor.close()
-        db.close()
+        with db_cursor() as (db, cursor):
+            cursor.execute(
+                """INSERT INTO posts 
+                   (user_id, account_id, content, post_date, likes, comments, shares, impressions)
+                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
+                (user_id, account_id, content, datetime.now(), likes, comments, shares, impressions)
+            )
+            db.commit()
+            post_id = cursor.lastrowid
 
         return jsonify({
             'message': 'Post added successfully',
@@ -347,6 +504,17 @@ def add_post(data):
 
 # ==================== AI Analysis Functions ====================
 
+POSITIVE_KEYWORDS = ['amazing', 'great', 'love', 'awesome', 'excellent']
+NEGATIVE_KEYWORDS = ['hate', 'bad', 'terrible', 'awful']
+
+# Mock ai_score range for each sentiment label
+SENTIMENTS = ('positive', 'neutral', 'negative')
+SENTIMENT_SCORE_LOW = np.array([0.7, 0.4, 0.0])
+SENTIMENT_SCORE_HIGH = np.array([1.0, 0.6, 0.3])
+
+_rng = np.random.default_rng()
+
+
 def analyze_sentiment(data):
     """Analyze posts for sentiment, trends, and AI score (mock AI)"""
     posts = data.get('posts', [])
@@ -355,30 +523,29 @@ def analyze_sentiment(data):
         return jsonify({'error': 'No posts provided'}), 400
 
     try:
-        # Mock AI sentiment analysis
-        results = []
-        sentiments = ['positive', 'neutral', 'negative']
-
-        for post in posts:
-            content = post.get('content', '')
-            # Simple mock sentiment based on keywords
-            if any(word in content.lower() for word in ['amazing', 'great', 'love', 'awesome', 'excellent']):
-                sentiment = 'positive'
-                ai_score = random.uniform(0.7, 1.0)
-            elif any(word in content.lower() for word in ['hate', 'bad', 'terrible', 'awful']):
-                sentiment = 'negative'
-                ai_score = random.uniform(0.0, 0.3)
-            else:
-                sentiment = 'neutral'
-                ai_score = random.uniform(0.4, 0.6)
-
-            results.append({
+        # Mock AI sentiment analysis based on keywords
+        contents = [post.get('content', '') for post in posts]
+        groups = keyword_groups_batch([content.lower() for content in contents])
+        positive = (groups & KEYWORD_POSITIVE) != 0
+        negative = (groups & KEYWORD_NEGATIVE) != 0
+        # Indexes into SENTIMENTS; positive keywords win over negative ones
+        labels = np.select([positive, negative], [0, 2], default=1)
+
+        # Draw every post's score in one call, scaled into its label's range
+        low = SENTIMENT_SCORE_LOW[labels]
+        high = SENTIMENT_SCORE_HIGH[labels]
+        ai_scores = np.round(_rng.uniform(low, high), 2).tolist()
+
+        results = [
+            {
                 'post_id': post.get('id'),
                 'content': content,
-                'sentiment': sentiment,
-                'ai_score': round(ai_score, 2),
+                'sentiment': SENTIMENTS[label],
+                'ai_score': ai_score,
                 'keywords': extract_keywords(content)
-            })
+            }
+            for post, content, label, ai_score in zip(posts, contents, labels.tolist(), ai_scores)
+        ]
 
         return jsonify({
             'analysis': results,
@@ -391,28 +558,30 @@ def analyze_sentiment(data):
 def get_ai_insights(user_id):
     """Generate AI insights based on user's posts"""
     try:
-        db = get_db()
-        cursor = db.cursor(dictionary=True)
-        cursor.execute(
-            "SELECT * FROM posts WHERE user_id=%s ORDER BY post_date DESC LIMIT 50",
-            (user_id,)
-        )
-        posts = cursor.fetchall()
-        cursor.close()
-        db.close()
+        with db_cursor() as (db, cursor):
+            # Aggregate the latest 50 posts on the server; only two numbers come back
+            cursor.execute(
+                """SELECT COUNT(*), SUM(likes + comments + shares)
+                   FROM (
+                       SELECT likes, comments, shares FROM posts
+                       WHERE user_id=%s ORDER BY post_date DESC LIMIT 50
+                   ) latest""",
+                (user_id,)
+            )
+            total_posts, total_engagement = cursor.fetchone()
 
-        if not posts:
+        if not total_posts:
             return jsonify({
                 'insights': 'No posts to analyze yet. Start by connecting your accounts!',
                 'recommendations': []
             }), 200
 
-        # Generate mock AI insights
-        total_engagement = sum(p.get('likes', 0) + p.get('comments', 0) + p.get('shares', 0) for p in posts)
-        avg_engagement = total_engagement / len(posts) if posts else 0
+        # Generate mock AI insights (SUM() comes back as Decimal)
+        total_engagement = int(total_engagement or 0)
+        avg_engagement = total_engagement / total_posts
 
         insights = {
-            'total_posts': len(posts),
+            'total_posts': total_posts,
             'total_engagement': total_engagement,
             'average_engagement': round(avg_engagement, 2),
             'insights': [
@@ -431,34 +600,43 @@ def get_ai_insights(user_id):
 def get_analytics_summary(user_id):
     """Get weekly/monthly analytics summary"""
     try:
-        db = get_db()
-        cursor = db.cursor(dictionary=True)
-
-        # Get posts from last 30 days
-        cursor.execute(
-            "SELECT * FROM posts WHERE user_id=%s AND post_date >= DATE_SUB(NOW(), INTERVAL 30 DAY)",
-            (user_id,)
-        )
-        posts = cursor.fetchall()
-        cursor.close()
-        db.close()
+        with db_cursor(dictionary=True) as (db, cursor):
+            # Aggregate posts from last 30 days in a single pass on the server
+            cursor.execute(
+                """SELECT
+                    COUNT(*) as total_posts,
+                    SUM(likes) as total_likes,
+                    SUM(comments) as total_comments,
+                    SUM(shares) as total_shares,
+                    SUM(impressions) as total_impressions
+                   FROM posts
+                   WHERE user_id=%s AND post_date >= DATE_SUB(NOW(), INTERVAL 30 DAY)""",
+                (user_id,)
+            )
+            totals = cursor.fetchone()
 
-        if not posts:
+        total_posts = totals['total_posts']
+        if not total_posts:
             return jsonify({
                 'summary': 'No data available',
                 'stats': {}
             }), 200
 
+        # SUM() comes back as Decimal
+        total_likes = int(totals['total_likes'] or 0)
+        total_comments = int(totals['total_comments'] or 0)
+        total_shares = int(totals['total_shares'] or 0)
+
         # Calculate statistics
         stats = {
-            'total_posts': len(posts),
-            'total_likes': sum(p.get('likes', 0) for p in posts),
-            'total_comments': sum(p.get('comments', 0) for p in posts),
-            'total_shares': sum(p.get('shares', 0) for p in posts),
-            'total_impressions': sum(p.get('impressions', 0) for p in posts),
-            'average_likes': round(sum(p.get('likes', 0) for p in posts) / len(posts), 2),
-            'average_comments': round(sum(p.get('comments', 0) for p in posts) / len(posts), 2),
-            'average_engagement_rate': round((sum(p.get('likes', 0) + p.get('comments', 0) + p.get('shares', 0) for p in posts) / (len(posts) * 100)) * 100, 2)
+            'total_posts': total_posts,
+            'total_likes': total_likes,
+            'total_comments': total_comments,
+            'total_shares': total_shares,
+            'total_impressions': int(totals['total_impressions'] or 0),
+            'average_likes': round(total_likes / total_posts, 2),
+            'average_comments': round(total_comments / total_posts, 2),
+            'average_engagement_rate': round(((total_likes + total_comments + total_shares) / (total_posts * 100)) * 100, 2)
         }
 
         return jsonify({
@@ -470,70 +648,69 @@ def get_analytics_summary(user_id):
         return jsonify({'error': str(e)}), 400
 
 
+# Recommendations are static; serialize them once and only splice in the timestamp
+_TIMESTAMP_PLACEHOLDER = '__timestamp__'
+_RECOMMENDATIONS = {
+    'best_posting_times': [
+        {'day': 'Monday-Friday', 'time': '6:00 PM - 9:00 PM', 'engagement': '45%', 'reason': 'Post-work engagement peak'},
+        {'day': 'Tuesday-Thursday', 'time': '9:00 AM - 10:00 AM', 'engagement': '35%', 'reason': 'Morning commute'},
+        {'day': 'Saturday', 'time': '10:00 AM - 12:00 PM', 'engagement': '35%', 'reason': 'Weekend morning scroll'},
+        {'day': 'Sunday', 'time': '7:00 PM - 9:00 PM', 'engagement': '38%', 'reason': 'Sunday evening'}
+    ],
+    'content_recommendations': [
+        'Increase use of carousel posts - 2.3x more engagement',
+        'Include 3-5 relevant hashtags per post for maximum reach',
+        'Post videos 2-3 times per week for 5x better reach',
+        'Use call-to-action buttons to boost clicks by 65%',
+        'Share user-generated content to build community (15% boost)',
+        'Post educational content on weekdays, entertainment on weekends',
+        'Use trending audio in video content for 40% more reach'
+    ],
+    'hashtag_strategy': {
+        'optimal_count': '3-5 hashtags per post',
+        'distribution': ['1 branded hashtag', '2-3 niche hashtags', '1 trending hashtag'],
+        'trending_categories': ['#AI', '#Analytics', '#SocialMedia', '#Marketing', '#Tech', '#Data'],
+        'best_performing': ['#AI', '#DigitalMarketing', '#DataAnalytics']
+    },
+    'content_mix': {
+        'educational': '30%',
+        'promotional': '20%',
+        'entertainment': '35%',
+        'user_generated': '15%'
+    },
+    'engagement_tips': [
+        'Reply to comments within first hour for 60% more engagement',
+        'Use questions in captions to boost comments by 50%',
+        'Post consistently at same times for algorithm favor',
+        'Collaborate with 5-10 accounts weekly for cross-promotion',
+        'Use stories/reels for 2-3x reach vs regular posts'
+    ],
+    'timestamp': _TIMESTAMP_PLACEHOLDER
+}
+_RECOMMENDATIONS_HEAD, _RECOMMENDATIONS_TAIL = orjson.dumps(_RECOMMENDATIONS).decode('utf-8').split(
+    f'"{_TIMESTAMP_PLACEHOLDER}"'
+)
+
+
 def generate_recommendations(user_id):
     """Generate AI-powered recommendations for posting strategy"""
-    recommendations = {
-        'best_posting_times': [
-            {'day': 'Monday-Friday', 'time': '6:00 PM - 9:00 PM', 'engagement': '45%', 'reason': 'Post-work engagement peak'},
-            {'day': 'Tuesday-Thursday', 'time': '9:00 AM - 10:00 AM', 'engagement': '35%', 'reason': 'Morning commute'},
-            {'day': 'Saturday', 'time': '10:00 AM - 12:00 PM', 'engagement': '35%', 'reason': 'Weekend morning scroll'},
-            {'day': 'Sunday', 'time': '7:00 PM - 9:00 PM', 'engagement': '38%', 'reason': 'Sunday evening'}
-        ],
-        'content_recommendations': [
-            'Increase use of carousel posts - 2.3x more engagement',
-            'Include 3-5 relevant hashtags per post for maximum reach',
-            'Post videos 2-3 times per week for 5x better reach',
-            'Use call-to-action buttons to boost clicks by 65%',
-            'Share user-generated content to build community (15% boost)',
-            'Post educational content on weekdays, entertainment on weekends',
-            'Use trending audio in video content for 40% more reach'
-        ],
-        'hashtag_strategy': {
-            'optimal_count': '3-5 hashtags per post',
-            'distribution': ['1 branded hashtag', '2-3 niche hashtags', '1 trending hashtag'],
-            'trending_categories': ['#AI', '#Analytics', '#SocialMedia', '#Marketing', '#Tech', '#Data'],
-            'best_performing': ['#AI', '#DigitalMarketing', '#DataAnalytics']
-        },
-        'content_mix': {
-            'educational': '30%',
-            'promotional': '20%',
-            'entertainment': '35%',
-            'user_generated': '15%'
-        },
-        'engagement_tips': [
-            'Reply to comments within first hour for 60% more engagement',
-            'Use questions in captions to boost comments by 50%',
-            'Post consistently at same times for algorithm favor',
-            'Collaborate with 5-10 accounts weekly for cross-promotion',
-            'Use stories/reels for 2-3x reach vs regular posts'
-        ],
-        'timestamp': datetime.now().isoformat()
-    }
-
-    return jsonify(recommendations), 200
+    body = f'{_RECOMMENDATIONS_HEAD}"{_now_iso()}"{_RECOMMENDATIONS_TAIL}'
+    return Response(body, mimetype='application/json'), 200
 
 
 def delete_account(user_id, account_id):
     """Delete a connected account"""
     try:
-        db = get_db()
-        cursor = db.cursor()
-        
-        # Verify ownership
-        cursor.execute("SELECT user_id FROM social_accounts WHERE id=%s", (account_id,))
-        account = cursor.fetchone()
-        if not account or account[0] != user_id:
-            return jsonify({'error': 'Unauthorized'}), 403
-        
-        cursor.execute("DELETE FROM social_accounts WHERE id=%s AND user_id=%s", (account_id, user_id))
-        db.commit()
-        cursor.close()
-        db.close()
+        with db_cursor() as (db, cursor):
+            # The user_id condition doubles as the ownership check
+            cursor.execute("DELETE FROM social_accounts WHERE id=%s AND user_id=%s", (account_id, user_id))
+            # Missing and foreign ids are deliberately indistinguishable (both 403)
+            if cursor.rowcount == 0:
+                return jsonify({'error': 'Unauthorized'}), 403
+            db.commit()
 
         # Clear cache
-        cache_key = f"accounts_{user_id}"
-        if cache_key in analytics_cache:
-            del analytics_cache[cache_key]
+        analytics_cache.delete(f"accounts_{user_id}")
 
         return jsonify({'message': 'Account disconnected successfully'}), 200
     except mysql.connector.Error as e:
@@ -545,30 +722,24 @@ def delete_account(user_id, account_id):
 def update_post(user_id, post_id, data):
     """Update a post"""
     try:
-        db = get_db()
-        cursor = db.cursor()
-        
-        # Verify ownership
-        cursor.execute("SELECT user_id FROM posts WHERE id=%s", (post_id,))
-        post = cursor.fetchone()
-        if not post or post[0] != user_id:
-            return jsonify({'error': 'Unauthorized'}), 403
-        
         likes = max(0, int(data.get('likes', 0)))
         comments = max(0, int(data.get('comments', 0)))
         shares = max(0, int(data.get('shares', 0)))
         impressions = max(0, int(data.get('impressions', 0)))
         content = data.get('content', '').strip()
-        
-        cursor.execute(
-            """UPDATE posts 
-               SET likes=%s, comments=%s, shares=%s, impressions=%s, content=%s
-               WHERE id=%s AND user_id=%s""",
-            (likes, comments, shares, impressions, content, post_id, user_id)
-        )
-        db.commit()
-        cursor.close()
-        db.close()
+
+        with db_cursor() as (db, cursor):
+            # The user_id condition doubles as the ownership check
+            cursor.execute(
+                """UPDATE posts 
+                   SET likes=%s, comments=%s, shares=%s, impressions=%s, content=%s
+                   WHERE id=%s AND user_id=%s""",
+                (likes, comments, shares, impressions, content, post_id, user_id)
+            )
+            # Missing and foreign ids are deliberately indistinguishable (both 403)
+            if cursor.rowcount == 0:
+                return jsonify({'error': 'Unauthorized'}), 403
+            db.commit()
 
         return jsonify({'message': 'Post updated successfully'}), 200
     except mysql.connector.Error as e:
@@ -580,24 +751,14 @@ def update_post(user_id, post_id, data):
 def get_trending_posts(user_id, limit=10):
     """Get trending posts by engagement"""
     try:
-        db = get_db()
-        cursor = db.cursor(dictionary=True)
-        
-        cursor.execute(
-            """SELECT * FROM posts 
-               WHERE user_id=%s 
-               ORDER BY (likes + comments + shares) DESC 
-               LIMIT %s""",
-            (user_id, limit)
-        )
-        trending = cursor.fetchall()
-        cursor.close()
-        db.close()
+        with db_cursor(dictionary=True) as (db, cursor):
+            cursor.execute(TRENDING_POSTS_SQL, (user_id, limit))
+            trending = cursor.fetchall()
 
         return jsonify({
             'trending_posts': trending,
             'total': len(trending),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': _now_iso()
         }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -606,48 +767,46 @@ def get_trending_posts(user_id, limit=10):
 def get_user_stats(user_id):
     """Get comprehensive user statistics"""
     try:
-        db = get_db()
-        cursor = db.cursor(dictionary=True)
-        
-        # User info
-        cursor.execute("SELECT * FROM users WHERE id=%s", (user_id,))
-        user = cursor.fetchone()
-        
-        # Account stats
-        cursor.execute("SELECT COUNT(*) as count FROM social_accounts WHERE user_id=%s", (user_id,))
-        accounts_count = cursor.fetchone()['count']
-        
-        # Post stats
-        cursor.execute("SELECT COUNT(*) as count FROM posts WHERE user_id=%s", (user_id,))
-        posts_count = cursor.fetchone()['count']
-        
-        # Engagement stats
-        cursor.execute(
-            """SELECT 
-                SUM(likes) as total_likes,
-                SUM(comments) as total_comments,
-                SUM(shares) as total_shares,
-                SUM(impressions) as total_impressions
-               FROM posts WHERE user_id=%s""",
-            (user_id,)
-        )
-        engagement = cursor.fetchone()
-        cursor.close()
-        db.close()
+        with db_cursor(dictionary=True) as (db, cursor):
+            # User info, account count and post aggregates in one round trip
+            cursor.execute(
+                """SELECT
+                    u.id, u.username, u.email, u.created_at,
+                    (SELECT COUNT(*) FROM social_accounts WHERE user_id=u.id) as accounts_count,
+                    p.posts_count, p.total_likes, p.total_comments, p.total_shares, p.total_impressions
+                   FROM users u
+                   CROSS JOIN (
+                       SELECT
+                           COUNT(*) as posts_count,
+                           SUM(likes) as total_likes,
+                           SUM(comments) as total_comments,
+                           SUM(shares) as total_shares,
+                           SUM(impressions) as total_impressions
+                       FROM posts WHERE user_id=%s
+                   ) p
+                   WHERE u.id=%s""",
+                (user_id, user_id)
+            )
+            user = cursor.fetchone()
+
+        # SUM() comes back as Decimal (or NULL with no posts)
+        total_likes = int(user['total_likes'] or 0)
+        total_comments = int(user['total_comments'] or 0)
+        total_shares = int(user['total_shares'] or 0)
 
         stats = {
             'user_id': user['id'],
             'username': user['username'],
             'email': user['email'],
             'created_at': str(user['created_at']),
-            'accounts_count': accounts_count,
-            'posts_count': posts_count,
-            'total_likes': engagement['total_likes'] or 0,
-            'total_comments': engagement['total_comments'] or 0,
-            'total_shares': engagement['total_shares'] or 0,
-            'total_impressions': engagement['total_impressions'] or 0,
-            'total_engagement': (engagement['total_likes'] or 0) + (engagement['total_comments'] or 0) + (engagement['total_shares'] or 0),
-            'timestamp': datetime.now().isoformat()
+            'accounts_count': user['accounts_count'],
+            'posts_count': user['posts_count'],
+            'total_likes': total_likes,
+            'total_comments': total_comments,
+            'total_shares': total_shares,
+            'total_impressions': int(user['total_impressions'] or 0),
+            'total_engagement': total_likes + total_comments + total_shares,
+            'timestamp': _now_iso()
         }
 
         return jsonify(stats), 200
@@ -655,50 +814,173 @@ def get_user_stats(user_id):
         return jsonify({'error': str(e)}), 500
 
 
+EXPORT_CHUNK_ROWS = 1000
+
+
+def _export_csv_chunks(user_id):
+    """Yield the CSV export EXPORT_CHUNK_ROWS rows at a time, read off an unbuffered cursor
+
+    The first chunk (header) is produced as soon as the query has run.
+    """
+    with db_cursor(buffered=False) as (db, cursor):
+        cursor.execute(EXPORT_POSTS_SQL, (user_id,))
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(cursor.column_names)
+        yield output.getvalue()
+        output.seek(0)
+        output.truncate(0)
+
+        for i, row in enumerate(cursor, 1):
+            writer.writerow(row)
+            if i % EXPORT_CHUNK_ROWS == 0:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate(0)
+        yield output.getvalue()
+
+
+def _export_json_chunks(user_id, exported_at):
+    """Yield the JSON export as array fragments of EXPORT_CHUNK_ROWS rows, read off an unbuffered cursor
+
+    The first chunk is produced as soon as the query has run; the total is
+    only known at the end, so it follows the data.
+    """
+    with db_cursor(dictionary=True, buffered=False) as (db, cursor):
+        cursor.execute(EXPORT_POSTS_SQL, (user_id,))
+        yield b'{"data": ['
+        total = 0
+        for rows in iter(lambda: cursor.fetchmany(EXPORT_CHUNK_ROWS), []):
+            chunk = b', '.join(map(orjson.dumps, rows))
+            yield chunk if total == 0 else b', ' + chunk
+            total += len(rows)
+        yield b'], "total": %d, "exported_at": %s}' % (total, orjson.dumps(exported_at))
+
+
+def _export_ndjson_chunks(user_id):
+    """Yield the export as newline-delimited JSON, one row per line"""
+    with db_cursor(dictionary=True, buffered=False) as (db, cursor):
+        cursor.execute(EXPORT_POSTS_SQL, (user_id,))
+        yield b''
+        for rows in iter(lambda: cursor.fetchmany(EXPORT_CHUNK_ROWS), []):
+            yield b''.join(orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE) for row in rows)
+
+
 def export_analytics(user_id, format_type='json'):
-    """Export user analytics"""
+    """Export user analytics as a streamed response"""
     try:
-        db = get_db()
-        cursor = db.cursor(dictionary=True)
-        
-        cursor.execute("SELECT * FROM posts WHERE user_id=%s ORDER BY post_date DESC", (user_id,))
-        posts = cursor.fetchall()
-        cursor.close()
-        db.close()
-
         if format_type == 'csv':
-            output = io.StringIO()
-            if posts:
-                fieldnames = posts[0].keys()
-                writer = csv.DictWriter(output, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(posts)
-            
-            return output.getvalue(), 200, {'Content-Type': 'text/csv', 'Content-Disposition': 'attachment; filename=analytics.csv'}
+            chunks = _export_csv_chunks(user_id)
+            mimetype = 'text/csv'
+            headers = {'Content-Disposition': 'attachment; filename=analytics.csv'}
+        elif format_type == 'ndjson':
+            chunks = _export_ndjson_chunks(user_id)
+            mimetype = 'application/x-ndjson'
+            headers = None
         else:
-            return jsonify({
-                'data': posts,
-                'total': len(posts),
-                'exported_at': datetime.now().isoformat()
-            }), 200
+            chunks = _export_json_chunks(user_id, _now_iso())
+            mimetype = 'application/json'
+            headers = None
+
+        # Run the query here so database errors still get a JSON 500
+        first = next(chunks)
+        return Response(
+            stream_with_context(itertools.chain([first], chunks)),
+            mimetype=mimetype,
+            headers=headers
+        ), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+# ==================== Text Kernels ====================
+# Compiled eagerly at import (cached on disk) so the first request doesn't pay the JIT cost
+
+KEYWORD_POSITIVE = 1
+KEYWORD_NEGATIVE = 2
+
+# Keyword table: concatenated UTF-8 bytes, start offsets and the group bit of each keyword
+_KEYWORDS = [(word, KEYWORD_POSITIVE) for word in POSITIVE_KEYWORDS] + \
+            [(word, KEYWORD_NEGATIVE) for word in NEGATIVE_KEYWORDS]
+_KEYWORD_BYTES = np.frombuffer(bytearray(''.join(w for w, _ in _KEYWORDS).encode('utf-8')), dtype=np.uint8)
+_KEYWORD_OFFSETS = np.cumsum([0] + [len(w.encode('utf-8')) for w, _ in _KEYWORDS]).astype(np.int64)
+_KEYWORD_GROUPS = np.array([group for _, group in _KEYWORDS], dtype=np.int64)
+
+
+@njit('int64(uint8[:], uint8[:], int64[:], int64[:])', cache=True)
+def _scan_keywords(text, keywords, offsets, groups):
+    """Bitmask of the keyword groups occurring anywhere in text (substring match)"""
+    all_groups = 0
+    for k in range(groups.shape[0]):
+        all_groups |= groups[k]
+
+    found = 0
+    n = text.shape[0]
+    for i in range(n):
+        for k in range(groups.shape[0]):
+            if found & groups[k]:
+                continue
+            start = offsets[k]
+            length = offsets[k + 1] - start
+            if i + length > n:
+                continue
+            matched = True
+            for j in range(length):
+                if text[i + j] != keywords[start + j]:
+                    matched = False
+                    break
+            if matched:
+                found |= groups[k]
+        if found == all_groups:
+            break
+    return found
+
+
+@njit('int64[:](uint8[:], int64[:], uint8[:], int64[:], int64[:])', cache=True)
+def _scan_keywords_batch(texts, text_offsets, keywords, offsets, groups):
+    """_scan_keywords for each text in a concatenated buffer (text i is texts[text_offsets[i]:text_offsets[i + 1]])"""
+    found = np.empty(text_offsets.shape[0] - 1, dtype=np.int64)
+    for i in range(found.shape[0]):
+        found[i] = _scan_keywords(texts[text_offsets[i]:text_offsets[i + 1]], keywords, offsets, groups)
+    return found
+
+
+def keyword_groups_batch(texts):
+    """KEYWORD_POSITIVE / KEYWORD_NEGATIVE bits for each (lowercased) text, in one compiled call"""
+    encoded = [text.encode('utf-8') for text in texts]
+    text_offsets = np.cumsum([0] + [len(e) for e in encoded]).astype(np.int64)
+    buffer = np.frombuffer(bytearray(b''.join(encoded)), dtype=np.uint8)
+    return _scan_keywords_batch(buffer, text_offsets, _KEYWORD_BYTES, _KEYWORD_OFFSETS, _KEYWORD_GROUPS)
+
+
 # ==================== Helper Functions ====================
 
+# Response "timestamp" fields are rendered at most once per NOW_ISO_RESOLUTION
+# seconds; stored record dates still use exact datetime.now()
+NOW_ISO_RESOLUTION = 0.01
+_now_iso_cache = (float('-inf'), '')
+
+
+def _now_iso():
+    """datetime.now().isoformat(), reused for NOW_ISO_RESOLUTION seconds"""
+    global _now_iso_cache
+    t = time.time()
+    cached_at, value = _now_iso_cache
+    if not 0 <= t - cached_at < NOW_ISO_RESOLUTION:
+        value = datetime.fromtimestamp(t).isoformat()
+        _now_iso_cache = (t, value)
+    return value
+
+
+COMMON_WORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'is', 'was', 'are'})
+_PUNCTUATION_TABLE = str.maketrans('', '', '.,!?;:"\'')
+
+
 def extract_keywords(text, limit=5):
-    """Extract keywords from text"""
-    keywords = []
-    common_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'is', 'was', 'are'}
-    
-    words = text.lower().split()
-    for word in words:
-        clean_word = word.strip('.,!?;:"\'')
-        if len(clean_word) > 3 and clean_word not in common_words:
-            keywords.append(clean_word)
-    
-    return list(set(keywords))[:limit]
+    """Extract keywords from text (distinct, in order of appearance)"""
+    words = text.lower().translate(_PUNCTUATION_TABLE).split()
+    keywords = dict.fromkeys(word for word in words if len(word) > 3 and word not in COMMON_WORDS)
+    return list(keywords)[:limit]
 
 
 def count_sentiments(results):
@@ -38,7 +38,10 @@ CREATE TABLE IF NOT EXISTS posts (
 	keywords VARCHAR(255),
 	created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
 	FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-	FOREIGN KEY (account_id) REFERENCES social_accounts(id) ON DELETE CASCADE
+	FOREIGN KEY (account_id) REFERENCES social_accounts(id) ON DELETE CASCADE,
+	-- Serve "latest posts" listings (optionally per account) without a filesort
+	INDEX idx_posts_user_date (user_id, post_date DESC, id),
+	INDEX idx_posts_user_account_date (user_id, account_id, post_date DESC)
 );
 
 -- Analytics Cache table